@@ -1,13 +1,19 @@
+import time
+import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-import numpy as np
-import pandas as pd
+from bisect import bisect_left, bisect_right
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 from dataclasses import dataclass
 from enum import Enum
 import json
 
+# numpy is imported where it is used so that loading the agent, e.g.
+# transitively from orchestration, stays cheap
+if TYPE_CHECKING:
+    import numpy as np
+
 # Data Models
 class TimePeriod(str, Enum):
     DAILY = "daily"
@@ -15,7 +21,7 @@ class TimePeriod(str, Enum):
     MONTHLY = "monthly"
     YEARLY = "yearly"
 
-@dataclass
+@dataclass(slots=True)
 class FinancialMetrics:
     net_worth: Optional[float] = None
     cash_flow: Optional[float] = None
@@ -25,12 +31,145 @@ class FinancialMetrics:
     debt_to_income: Optional[float] = None
     expense_categories: Optional[Dict[str, float]] = None
 
+# Look-back window (days) fetched for each analysis period
+_PERIOD_DAYS = {
+    TimePeriod.DAILY: 1,
+    TimePeriod.WEEKLY: 28,
+    TimePeriod.MONTHLY: 30,
+    TimePeriod.YEARLY: 365,
+}
+
+# Health score lookup tables: points[searchsorted(thresholds, value)]
+# (plain tuples, so np.searchsorted can still score arrays of users in bulk)
+_CREDIT_THRESH = (650, 700, 750)
+_CREDIT_PTS = (0, 15, 20, 25)
+_DTI_THRESH = (0.35, 0.5)
+_DTI_PTS = (25, 15, 0)
+_EMERGENCY_THRESH = (3, 6)
+_EMERGENCY_PTS = (0, 15, 25)
+
+# Recommendation rules: (metric, applies(metrics), message template)
+_REC_RULES = (
+    ('net_worth',
+     lambda m: m.get('net_worth', 0) < 0,
+     "Focus on reducing debt to improve your net worth."),
+    ('credit_score',
+     lambda m: bool(m.get('credit_score')) and m['credit_score'] < 650,
+     "Consider improving your credit score by paying bills on time and reducing credit utilization."),
+    ('emergency_fund_months',
+     lambda m: m.get('emergency_fund_months', 0) < 3,
+     "Build an emergency fund to cover at least 3-6 months of expenses. You currently have {emergency_months:.1f} months covered."),
+    ('debt_to_income',
+     lambda m: bool(m.get('debt_to_income')) and m['debt_to_income'] > 0.35,
+     "Consider strategies to reduce your debt-to-income ratio, such as paying down high-interest debt."),
+)
+
+def _score(thresholds: Tuple[float, ...], points: Tuple[int, ...], value: float, side: str = 'right') -> int:
+    """Look up the points awarded for ``value`` in a threshold table."""
+    # bisect_right/bisect_left match np.searchsorted's side='right'/'left'
+    search = bisect_right if side == 'right' else bisect_left
+    return points[search(thresholds, value)]
+
+def _transaction_columns(transactions) -> Tuple['np.ndarray', 'np.ndarray']:
+    """Extract (categories, amounts) columns from a transactions payload.
+    
+    Accepts the usual list of dicts, or an Arrow table / Arrow IPC stream
+    bytes, whose columns are read without building per-row Python objects.
+    """
+    import numpy as np
+    if isinstance(transactions, list):
+        n = len(transactions)
+        # Rows missing a field become NaN / None, which _sum_by_group skips
+        amounts = np.fromiter((np.nan if (a := t.get('amount')) is None else a for t in transactions),
+                              dtype=np.float64, count=n)
+        categories = np.array([t.get('category') for t in transactions], dtype=object)
+        return categories, amounts
+    
+    import pyarrow as pa
+    if isinstance(transactions, (bytes, bytearray, memoryview)):
+        transactions = pa.ipc.open_stream(transactions).read_all()
+    amounts = transactions.column('amount').cast(pa.float64()).to_numpy()
+    categories = transactions.column('category').to_numpy()
+    return categories, amounts
+
+def _sum_by_group(keys: 'np.ndarray', values: 'np.ndarray', dropna: bool = True) -> Dict:
+    """Sum values per distinct key, returning a {key: total} dict.
+    
+    Keys are factorized with a dict rather than sorted, so mixed or
+    unorderable keys (e.g. str and None) work and groups come out in
+    first-seen order. With ``dropna`` missing keys (None or NaN) are
+    dropped, as in pandas' groupby; otherwise they get their own group.
+    NaN values are skipped, as in a nansum.
+    """
+    import numpy as np
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(k, len(index)) for k in keys.tolist()),
+                        dtype=np.intp, count=len(keys))
+    sums = np.bincount(codes, weights=np.where(np.isnan(values), 0.0, values),
+                       minlength=len(index))
+    return {k: total for k, total in zip(index, sums.tolist())
+            if not dropna or (k is not None and k == k)}  # k != k only for NaN
+
 class AnalyticsAgent:
+    # Seconds a fetched FI Money response is reused before calling MCP again
+    CACHE_TTL = 30.0
+    
     def __init__(self, fi_money_agent):
         self.fi_money_agent = fi_money_agent
         self.metrics = FinancialMetrics()
         self._setup_tools()
     
+    @property
+    def fi_money_agent(self):
+        return self._fi_money_agent
+    
+    @fi_money_agent.setter
+    def fi_money_agent(self, agent):
+        # Responses belong to the agent (user/session) that fetched them, so
+        # swapping the agent drops anything cached or in flight for the old one
+        self._fi_money_agent = agent
+        self._cache: Dict[Tuple[int, str], Tuple[float, Any]] = {}
+        self._inflight: Dict[Tuple[int, str], 'asyncio.Task'] = {}
+    
+    async def _cached_fetch(self, name: str, fetch) -> Any:
+        """Return a recent result for ``name`` or await ``fetch()`` and cache it.
+        
+        Entries are keyed by the current fi_money_agent as well as ``name``.
+        Concurrent callers share one in-flight fetch per key. Empty or failed
+        responses are not cached, so a transient miss is retried next call.
+        """
+        key = (id(self._fi_money_agent), name)
+        entry = self._cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.CACHE_TTL:
+            return entry[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_cache(key, fetch))
+            self._inflight[key] = task
+        # shield: a cancelled caller must not cancel the fetch others await
+        return await asyncio.shield(task)
+    
+    async def _fetch_and_cache(self, key: Tuple[int, str], fetch) -> Any:
+        """Await ``fetch()`` and cache a non-empty result under ``key``."""
+        cache, inflight = self._cache, self._inflight
+        try:
+            value = await fetch()
+            if value:
+                # Stored in the dict current when the fetch started, which is
+                # discarded if fi_money_agent was replaced in the meantime
+                cache[key] = (time.monotonic(), value)
+            return value
+        finally:
+            inflight.pop(key, None)
+    
+    async def _cached_net_worth(self) -> Any:
+        """Get net worth data, reusing a response fetched within CACHE_TTL."""
+        return await self._cached_fetch('net_worth', self.fi_money_agent.get_net_worth)
+    
+    async def _cached_credit_report(self) -> Any:
+        """Get the credit report, reusing a response fetched within CACHE_TTL."""
+        return await self._cached_fetch('credit_report', self.fi_money_agent.get_credit_report)
+    
     def _setup_tools(self):
         self.tools = [
             FunctionTool(
@@ -58,21 +197,39 @@ class AnalyticsAgent:
             )
         ]
     
+    async def analyze(self, period: TimePeriod = TimePeriod.MONTHLY,
+                      as_of: Optional[datetime] = None) -> Dict:
+        """Run the spending and investment analyses against one timestamp.
+        
+        Not registered as a tool (FunctionTool exposes every parameter to the
+        model); for callers such as the orchestrator that want both results
+        for the same point in time.
+        """
+        as_of = as_of or datetime.now()
+        spending, investments = await asyncio.gather(
+            self._analyze_spending_patterns(period, as_of),
+            self._calculate_investment_performance(as_of)
+        )
+        return {
+            "as_of": as_of.isoformat(),
+            "spending": spending,
+            "investment_performance": investments
+        }
+    
     async def analyze_spending_patterns(self, period: TimePeriod = TimePeriod.MONTHLY) -> Dict:
         """Analyze spending patterns over a specified time period."""
+        return await self._analyze_spending_patterns(period, datetime.now())
+    
+    async def _analyze_spending_patterns(self, period: TimePeriod, as_of: datetime) -> Dict:
+        """Analyze spending patterns over the time period ending at ``as_of``."""
         try:
             # Get transactions from FI Money
-            end_date = datetime.now()
-            if period == TimePeriod.MONTHLY:
-                start_date = end_date - timedelta(days=30)
-            elif period == TimePeriod.WEEKLY:
-                start_date = end_date - timedelta(weeks=4)
-            else:  # Default to 90 days
-                start_date = end_date - timedelta(days=90)
+            end_date = as_of
+            start_date = end_date - timedelta(days=_PERIOD_DAYS.get(period, 90))  # Default to 90 days
             
             # Format dates as strings for the API
-            start_str = start_date.strftime("%Y-%m-%d")
-            end_str = end_date.strftime("%Y-%m-%d")
+            start_str = start_date.date().isoformat()
+            end_str = end_date.date().isoformat()
             
             # Get transactions data
             transactions = await self.fi_money_agent.get_transactions(
@@ -80,20 +237,19 @@ class AnalyticsAgent:
                 end_date=end_str
             )
             
-            # Process transactions (simplified example)
-            df = pd.DataFrame(transactions)
-            if df.empty:
+            if not transactions:
                 return {"status": "No transaction data available", "period": period.value}
             
-            # Basic spending analysis
-            df['date'] = pd.to_datetime(df['date'])
-            df['amount'] = pd.to_numeric(df['amount'])
+            # Process transactions (simplified example)
+            categories, amounts = _transaction_columns(transactions)
+            if amounts.size == 0:  # e.g. an Arrow stream with a schema but no rows
+                return {"status": "No transaction data available", "period": period.value}
             
             # Group by category and sum amounts
-            spending_by_category = df.groupby('category')['amount'].sum().to_dict()
+            spending_by_category = _sum_by_group(categories, amounts)
             
-            # Calculate total spending
-            total_spent = df[df['amount'] < 0]['amount'].sum() * -1
+            # Calculate total spending as one masked reduction (no filtered copy)
+            total_spent = float(-amounts.sum(where=amounts < 0))
             
             # Calculate monthly average
             num_months = (end_date - start_date).days / 30
@@ -105,7 +261,7 @@ class AnalyticsAgent:
                 "total_spent": total_spent,
                 "monthly_average": monthly_avg,
                 "spending_by_category": spending_by_category,
-                "transaction_count": len(df)
+                "transaction_count": len(amounts)
             }
             
         except Exception as e:
@@ -113,9 +269,13 @@ class AnalyticsAgent:
     
     async def calculate_investment_performance(self) -> Dict:
         """Calculate investment performance metrics."""
+        return await self._calculate_investment_performance(datetime.now())
+    
+    async def _calculate_investment_performance(self, as_of: datetime) -> Dict:
+        """Calculate investment performance metrics as of ``as_of``."""
         try:
             # Get net worth data which includes investments
-            net_worth = await self.fi_money_agent.get_net_worth()
+            net_worth = await self._cached_net_worth()
             
             if not net_worth or 'investments' not in net_worth:
                 return {"status": "No investment data available"}
@@ -123,18 +283,21 @@ class AnalyticsAgent:
             investments = net_worth['investments']
             
             # Calculate total investments and returns
-            total_invested = sum(inv.get('invested_amount', 0) for inv in investments)
-            current_value = sum(inv.get('current_value', 0) for inv in investments)
+            import numpy as np
+            n = len(investments)
+            invested = np.fromiter((inv.get('invested_amount', 0) for inv in investments), dtype=np.float64, count=n)
+            current = np.fromiter((inv.get('current_value', 0) for inv in investments), dtype=np.float64, count=n)
+            total_invested = float(invested.sum())
+            current_value = float(current.sum())
             total_return = current_value - total_invested
             
             # Calculate XIRR (simplified)
-            xirr = self._calculate_xirr(investments) if investments else 0
+            xirr = self._calculate_xirr(total_invested, current_value, as_of) if investments else 0
             
             # Get asset allocation
-            asset_allocation = {}
-            for inv in investments:
-                asset_type = inv.get('asset_type', 'Other')
-                asset_allocation[asset_type] = asset_allocation.get(asset_type, 0) + inv.get('current_value', 0)
+            asset_types = np.array([inv.get('asset_type', 'Other') for inv in investments], dtype=object)
+            # Keep holdings with a null asset_type so the allocation adds up to current_value
+            asset_allocation = _sum_by_group(asset_types, current, dropna=False)
             
             return {
                 "status": "success",
@@ -149,22 +312,17 @@ class AnalyticsAgent:
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
-    def _calculate_xirr(self, investments: List[Dict]) -> float:
-        """Calculate XIRR for investments (simplified)."""
+    def _calculate_xirr(self, total_invested: float, current_value: float,
+                        as_of: Optional[datetime] = None) -> float:
+        """Calculate XIRR for investments (simplified) from their summed invested and current values."""
         # This is a simplified version - real implementation would need actual dates and cash flows
         try:
             # Mock implementation - replace with actual XIRR calculation
-            if not investments:
-                return 0.0
-                
             # Get current date and one year ago
-            end_date = datetime.now()
+            end_date = as_of or datetime.now()
             start_date = end_date - timedelta(days=365)
             
             # Calculate time-weighted return
-            total_invested = sum(inv.get('invested_amount', 0) for inv in investments)
-            current_value = sum(inv.get('current_value', 0) for inv in investments)
-            
             if total_invested <= 0:
                 return 0.0
                 
@@ -183,9 +341,11 @@ class AnalyticsAgent:
     async def assess_financial_health(self) -> Dict:
         """Assess overall financial health."""
         try:
-            # Get required data
-            net_worth_data = await self.fi_money_agent.get_net_worth()
-            credit_report = await self.fi_money_agent.get_credit_report()
+            # Get required data; the two MCP calls are independent so run them concurrently
+            net_worth_data, credit_report = await asyncio.gather(
+                self._cached_net_worth(),
+                self._cached_credit_report()
+            )
             
             # Calculate metrics
             score = 0
@@ -206,12 +366,7 @@ class AnalyticsAgent:
             # Credit score analysis
             if credit_report and 'credit_score' in credit_report:
                 credit_score = credit_report['credit_score']
-                if credit_score >= 750:
-                    score += 25
-                elif credit_score >= 700:
-                    score += 20
-                elif credit_score >= 650:
-                    score += 15
+                score += _score(_CREDIT_THRESH, _CREDIT_PTS, credit_score)
                 metrics['credit_score'] = credit_score
             
             # Debt to income ratio (simplified)
@@ -220,10 +375,7 @@ class AnalyticsAgent:
                 monthly_income = net_worth_data['monthly_income']
                 if monthly_income > 0:
                     debt_to_income = (liabilities / 12) / monthly_income  # Annual liabilities / monthly income
-                    if debt_to_income <= 0.35:
-                        score += 25
-                    elif debt_to_income <= 0.5:
-                        score += 15
+                    score += _score(_DTI_THRESH, _DTI_PTS, debt_to_income, side='left')
                     metrics['debt_to_income'] = debt_to_income
             
             # Emergency fund (simplified)
@@ -231,11 +383,7 @@ class AnalyticsAgent:
                 liquid_assets = net_worth_data['liquid_assets']
                 monthly_expenses = net_worth_data.get('monthly_expenses', 1)  # Avoid division by zero
                 emergency_months = liquid_assets / monthly_expenses if monthly_expenses > 0 else 0
-                
-                if emergency_months >= 6:
-                    score += 25
-                elif emergency_months >= 3:
-                    score += 15
+                score += _score(_EMERGENCY_THRESH, _EMERGENCY_PTS, emergency_months)
                 metrics['emergency_fund_months'] = emergency_months
             
             # Cap score at 100
@@ -253,38 +401,19 @@ class AnalyticsAgent:
     
     def _generate_recommendations(self, score: int, metrics: Dict) -> List[str]:
         """Generate personalized financial recommendations."""
-        recommendations = []
-        
-        # Net worth recommendations
-        if metrics.get('net_worth', 0) < 0:
-            recommendations.append("Focus on reducing debt to improve your net worth.")
-        
-        # Credit score recommendations
-        credit_score = metrics.get('credit_score')
-        if credit_score:
-            if credit_score < 650:
-                recommendations.append("Consider improving your credit score by paying bills on time and reducing credit utilization.")
-        
-        # Emergency fund recommendations
         emergency_months = metrics.get('emergency_fund_months', 0)
-        if emergency_months < 3:
-            recommendations.append(f"Build an emergency fund to cover at least 3-6 months of expenses. You currently have {emergency_months:.1f} months covered.")
-        
-        # Debt to income recommendations
-        debt_to_income = metrics.get('debt_to_income')
-        if debt_to_income and debt_to_income > 0.35:
-            recommendations.append("Consider strategies to reduce your debt-to-income ratio, such as paying down high-interest debt.")
-        
-        if not recommendations:
-            recommendations.append("Your financial health looks good! Continue with your current financial habits.")
+        recommendations = [
+            template.format(emergency_months=emergency_months)
+            for _, applies, template in _REC_RULES if applies(metrics)
+        ]
         
-        return recommendations
+        return recommendations or ["Your financial health looks good! Continue with your current financial habits."]
     
     async def predict_future_wealth(self, years: int = 5, monthly_contribution: float = 0) -> Dict:
         """Predict future net worth based on current trends."""
         try:
             # Get current financial data
-            net_worth_data = await self.fi_money_agent.get_net_worth()
+            net_worth_data = await self._cached_net_worth()
             
             if not net_worth_data:
                 return {"status": "No net worth data available"}
@@ -293,20 +422,31 @@ class AnalyticsAgent:
             
             # Make projections (simplified)
             # In a real implementation, use more sophisticated modeling
-            projected_net_worth = current_net_worth
-            projections = []
-            
             # Assume average annual return of 7% (adjust as needed)
             annual_return = 0.07
-            
-            for year in range(1, years + 1):
-                # Add annual contributions and apply returns
-                projected_net_worth = (projected_net_worth + (monthly_contribution * 12)) * (1 + annual_return)
-                projections.append({
+            annual_contribution = monthly_contribution * 12
+            
+            # Closed form of projected = (projected + annual_contribution) * (1 + annual_return),
+            # evaluated for every year at once instead of stepping the recurrence
+            import numpy as np
+            years_arr = np.arange(1, years + 1)
+            growth = (1 + annual_return) ** years_arr
+            projected_net_worth = (
+                current_net_worth * growth
+                + annual_contribution * (1 + annual_return) * (growth - 1) / annual_return
+            )
+            projections = [
+                {
                     "year": year,
-                    "projected_net_worth": projected_net_worth,
-                    "total_contributions": monthly_contribution * 12 * year
-                })
+                    "projected_net_worth": projected,
+                    "total_contributions": contributed
+                }
+                for year, projected, contributed in zip(
+                    years_arr.tolist(),
+                    projected_net_worth.tolist(),
+                    (annual_contribution * years_arr).tolist()
+                )
+            ]
             
             return {
                 "status": "success",
@@ -322,40 +462,44 @@ class AnalyticsAgent:
     async def get_credit_insights(self) -> Dict:
         """Get insights from credit report data."""
         try:
-            credit_report = await self.fi_money_agent.get_credit_report()
+            credit_report = await self._cached_credit_report()
             
             if not credit_report:
                 return {"status": "No credit report data available"}
             
+            utilization = credit_report.get('credit_utilization')
+            credit_age_months = credit_report.get('credit_age_months')
+            hard_inquiries = len(credit_report.get('inquiries', []))
+            derogatory_marks = credit_report.get('derogatory_marks', 0)
+            
             insights = {
                 "credit_score": credit_report.get('credit_score'),
                 "score_range": credit_report.get('score_range', '300-900'),
-                "credit_utilization": credit_report.get('credit_utilization'),
+                "credit_utilization": utilization,
                 "total_accounts": len(credit_report.get('accounts', [])),
-                "credit_age_months": credit_report.get('credit_age_months'),
-                "hard_inquiries": len(credit_report.get('inquiries', [])),
-                "derogatory_marks": credit_report.get('derogatory_marks', 0)
+                "credit_age_months": credit_age_months,
+                "hard_inquiries": hard_inquiries,
+                "derogatory_marks": derogatory_marks
             }
             
             # Generate insights
             recommendations = []
             
             # Credit utilization
-            utilization = insights.get('credit_utilization', 0)
-            if utilization > 0.3:  # More than 30% utilization
+            if (utilization or 0) > 0.3:  # More than 30% utilization
                 recommendations.append("Your credit utilization is high. Try to keep it below 30% for a better credit score.")
             
             # Credit age
-            credit_age_years = (insights.get('credit_age_months', 0) or 0) / 12
+            credit_age_years = (credit_age_months or 0) / 12
             if credit_age_years < 2:
                 recommendations.append("Your credit history is relatively short. Keep accounts open to build a longer credit history.")
             
             # Hard inquiries
-            if insights.get('hard_inquiries', 0) > 3:
+            if hard_inquiries > 3:
                 recommendations.append("You have several recent hard inquiries. Try to limit new credit applications.")
             
             # Derogatory marks
-            if insights.get('derogatory_marks', 0) > 0:
+            if derogatory_marks > 0:
                 recommendations.append("You have derogatory marks on your credit report. Consider addressing these to improve your credit score.")
             
             insights["recommendations"] = recommendations or ["Your credit profile looks good! Keep up the good financial habits."]
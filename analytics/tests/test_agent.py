@@ -0,0 +1,137 @@
+"""
+Tests for the AnalyticsAgent's vectorized helpers and analyses.
+"""
+import asyncio
+import math
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+pytest.importorskip('google.adk')
+
+from analytics.agent import (
+    AnalyticsAgent, _CREDIT_PTS, _CREDIT_THRESH, _DTI_PTS, _DTI_THRESH,
+    _EMERGENCY_PTS, _EMERGENCY_THRESH, _score, _sum_by_group, _transaction_columns,
+)
+
+
+class FakeFiMoney:
+    """Stands in for the FI Money agent, returning canned MCP responses."""
+    
+    def __init__(self, net_worth=None, credit_report=None, transactions=None):
+        self.net_worth = net_worth
+        self.credit_report = credit_report
+        self.transactions = transactions
+    
+    async def get_net_worth(self):
+        return self.net_worth
+    
+    async def get_credit_report(self):
+        return self.credit_report
+    
+    async def get_transactions(self, start_date, end_date):
+        return self.transactions
+
+
+def test_transaction_columns_from_dicts():
+    categories, amounts = _transaction_columns([
+        {'amount': -10, 'category': 'food'},
+        {'amount': '-4.5', 'category': 'food'},
+        {'category': 'rent'},
+        {'amount': -3},
+    ])
+    assert categories.tolist() == ['food', 'food', 'rent', None]
+    assert amounts[:2].tolist() == [-10.0, -4.5]
+    assert math.isnan(amounts[2]) and amounts[3] == -3.0
+
+
+def test_transaction_columns_from_arrow():
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table({'amount': [-1, 2], 'category': ['a', 'b']})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    for payload in (table, sink.getvalue().to_pybytes()):
+        categories, amounts = _transaction_columns(payload)
+        assert categories.tolist() == ['a', 'b']
+        assert amounts.tolist() == [-1.0, 2.0]
+
+
+def test_sum_by_group():
+    keys = np.array(['b', 'a', None, 'b', float('nan'), 'a'], dtype=object)
+    values = np.array([1.0, 2.0, 3.0, np.nan, 5.0, 4.0])
+    assert _sum_by_group(keys, values) == {'b': 1.0, 'a': 6.0}
+    kept = _sum_by_group(keys, values, dropna=False)
+    assert list(kept)[:3] == ['b', 'a', None]
+    assert kept[None] == 3.0 and len(kept) == 4
+    assert _sum_by_group(np.array([], dtype=object), np.array([])) == {}
+
+
+@pytest.mark.parametrize('thresholds, points, side, cases', [
+    (_CREDIT_THRESH, _CREDIT_PTS, 'right',
+     [(649, 0), (650, 15), (699, 15), (700, 20), (749, 20), (750, 25), (900, 25)]),
+    (_DTI_THRESH, _DTI_PTS, 'left',
+     [(0.0, 25), (0.35, 25), (0.36, 15), (0.5, 15), (0.51, 0)]),
+    (_EMERGENCY_THRESH, _EMERGENCY_PTS, 'right',
+     [(0, 0), (2.99, 0), (3, 15), (5.99, 15), (6, 25), (12, 25)]),
+])
+def test_score_boundaries(thresholds, points, side, cases):
+    for value, expected in cases:
+        assert _score(thresholds, points, value, side=side) == expected
+
+
+def test_spending_skips_rows_missing_fields():
+    transactions = [
+        {'amount': -10, 'category': 'food'},
+        {'amount': -5},
+        {'category': 'rent'},
+    ]
+    agent = AnalyticsAgent(FakeFiMoney(transactions=transactions))
+    result = asyncio.run(agent.analyze_spending_patterns())
+    assert result['status'] == 'success'
+    assert result['spending_by_category'] == {'food': -10.0, 'rent': 0.0}
+    assert result['total_spent'] == 15.0
+
+
+def test_asset_allocation_keeps_null_asset_type():
+    investments = [
+        {'invested_amount': 100, 'current_value': 100, 'asset_type': 'eq'},
+        {'invested_amount': 50, 'current_value': 40, 'asset_type': None},
+        {'invested_amount': 10, 'current_value': 10, 'asset_type': 'eq'},
+        {'invested_amount': 5, 'current_value': 7},
+    ]
+    agent = AnalyticsAgent(FakeFiMoney(net_worth={'investments': investments}))
+    result = asyncio.run(agent.calculate_investment_performance())
+    assert result['asset_allocation'] == {'eq': 110.0, None: 40.0, 'Other': 7.0}
+    assert sum(result['asset_allocation'].values()) == result['current_value']
+
+
+def test_analyze_shares_one_timestamp():
+    requested = []
+    
+    class RecordingFiMoney(FakeFiMoney):
+        async def get_transactions(self, start_date, end_date):
+            requested.append(end_date)
+            return self.transactions
+    
+    as_of = datetime(2024, 3, 31, 12, 0)
+    fi_money = RecordingFiMoney(
+        net_worth={'investments': [{'invested_amount': 100, 'current_value': 110, 'asset_type': 'eq'}]},
+        transactions=[{'amount': -10, 'category': 'food'}],
+    )
+    result = asyncio.run(AnalyticsAgent(fi_money).analyze(as_of=as_of))
+    assert result['as_of'] == as_of.isoformat()
+    assert requested == ['2024-03-31']
+    assert result['spending']['status'] == 'success'
+    assert result['investment_performance']['xirr'] == pytest.approx(10.0)
+
+
+def test_cache_is_dropped_when_fi_money_agent_changes():
+    agent = AnalyticsAgent(FakeFiMoney(credit_report={'credit_score': 700}))
+    assert asyncio.run(agent.get_credit_insights())['insights']['credit_score'] == 700
+    agent.fi_money_agent.credit_report = {'credit_score': 600}
+    assert asyncio.run(agent.get_credit_insights())['insights']['credit_score'] == 700  # cached
+    
+    agent.fi_money_agent = FakeFiMoney(credit_report={'credit_score': 800})
+    assert asyncio.run(agent.get_credit_insights())['insights']['credit_score'] == 800
@@ -1,4 +1,5 @@
 import os
+import re
 import asyncio
 from typing import Dict, Any, List, Optional
 from google.adk import Agent
@@ -46,6 +47,14 @@ root_agent = Agent(
     sub_agents=[fi_money_agent, lifestyle_agent]
 )
 
+# Routing keywords, compiled once into a single alternation per sub-agent so
+# each check is one regex scan of the query instead of a substring test per keyword
+FI_MONEY_KEYWORDS = ['balance', 'transaction', 'account', 'transfer', 'pay', 'deposit', 'withdraw']
+LIFESTYLE_KEYWORDS = ['advice', 'plan', 'budget', 'save', 'spend', 'invest', 'goal', 'lifestyle']
+
+FI_MONEY_PATTERN = re.compile('|'.join(map(re.escape, FI_MONEY_KEYWORDS)))
+LIFESTYLE_PATTERN = re.compile('|'.join(map(re.escape, LIFESTYLE_KEYWORDS)))
+
 async def route_query(user_query: str, context: Optional[Dict] = None) -> str:
     """
     Route the user query to the appropriate sub-agent(s) and return the response.
@@ -64,12 +73,9 @@ async def route_query(user_query: str, context: Optional[Dict] = None) -> str:
     query_lower = user_query.lower()
     
     # Check which agent should handle the query
-    fi_money_keywords = ['balance', 'transaction', 'account', 'transfer', 'pay', 'deposit', 'withdraw']
-    lifestyle_keywords = ['advice', 'plan', 'budget', 'save', 'spend', 'invest', 'goal', 'lifestyle']
-    
-    if any(keyword in query_lower for keyword in fi_money_keywords):
+    if FI_MONEY_PATTERN.search(query_lower):
         responses.append(f"[FI Money Agent] This would handle: {user_query}")
-    elif any(keyword in query_lower for keyword in lifestyle_keywords):
+    elif LIFESTYLE_PATTERN.search(query_lower):
         responses.append(f"[Lifestyle Agent] This would provide advice for: {user_query}")
     else:
         response = await root_agent.generate_response(user_query)
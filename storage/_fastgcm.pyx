@@ -0,0 +1,215 @@
+# cython: language_level=3
+# distutils: libraries = crypto
+"""
+Optional native AES-GCM for SecureStorage.
+
+Calls OpenSSL's EVP interface directly, skipping the per-call validation and
+object construction of the cryptography package. GCMContext has the same
+encrypt/decrypt signature and output layout (ciphertext followed by the
+16-byte tag) as cryptography's AESGCM, so either can decrypt the other's
+output.
+
+Build in place with:
+    cythonize -i storage/_fastgcm.pyx
+"""
+from cpython.buffer cimport PyBUF_SIMPLE, PyBuffer_Release, PyObject_GetBuffer
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_FromStringAndSize
+from libc.string cimport memset
+from cryptography.exceptions import InvalidTag
+
+
+cdef extern from "openssl/evp.h":
+    ctypedef struct EVP_CIPHER:
+        pass
+    ctypedef struct EVP_CIPHER_CTX:
+        pass
+    ctypedef struct ENGINE:
+        pass
+
+    int EVP_CTRL_GCM_SET_IVLEN
+    int EVP_CTRL_GCM_GET_TAG
+    int EVP_CTRL_GCM_SET_TAG
+
+    const EVP_CIPHER *EVP_aes_128_gcm()
+    const EVP_CIPHER *EVP_aes_192_gcm()
+    const EVP_CIPHER *EVP_aes_256_gcm()
+
+    EVP_CIPHER_CTX *EVP_CIPHER_CTX_new()
+    void EVP_CIPHER_CTX_free(EVP_CIPHER_CTX *ctx)
+    int EVP_CIPHER_CTX_ctrl(EVP_CIPHER_CTX *ctx, int type, int arg, void *ptr)
+
+    int EVP_EncryptInit_ex(EVP_CIPHER_CTX *ctx, const EVP_CIPHER *cipher, ENGINE *impl,
+                           const unsigned char *key, const unsigned char *iv)
+    int EVP_EncryptUpdate(EVP_CIPHER_CTX *ctx, unsigned char *out, int *outl,
+                          const unsigned char *inp, int inl)
+    int EVP_EncryptFinal_ex(EVP_CIPHER_CTX *ctx, unsigned char *out, int *outl)
+
+    int EVP_DecryptInit_ex(EVP_CIPHER_CTX *ctx, const EVP_CIPHER *cipher, ENGINE *impl,
+                           const unsigned char *key, const unsigned char *iv)
+    int EVP_DecryptUpdate(EVP_CIPHER_CTX *ctx, unsigned char *out, int *outl,
+                          const unsigned char *inp, int inl)
+    int EVP_DecryptFinal_ex(EVP_CIPHER_CTX *ctx, unsigned char *out, int *outl)
+
+
+cdef enum:
+    TAG_LENGTH = 16
+    DEFAULT_NONCE_LENGTH = 12  # EVP's GCM IV length until changed
+    MAX_LENGTH = 2147483647 - TAG_LENGTH  # EVP lengths are C ints
+
+
+cdef class GCMContext:
+    """AES-GCM cipher bound to one key, reusing its EVP contexts across calls.
+
+    The key schedule is set up once per direction; each call only installs
+    the new nonce. Arguments are read through the buffer protocol, so bytes,
+    bytearray and memoryview are accepted without copying.
+    """
+
+    cdef EVP_CIPHER_CTX *_enc
+    cdef EVP_CIPHER_CTX *_dec
+    cdef int _enc_nonce_length
+    cdef int _dec_nonce_length
+
+    def __cinit__(self, key):
+        cdef Py_buffer key_buf
+        cdef const EVP_CIPHER *cipher
+        PyObject_GetBuffer(key, &key_buf, PyBUF_SIMPLE)
+        try:
+            if key_buf.len == 16:
+                cipher = EVP_aes_128_gcm()
+            elif key_buf.len == 24:
+                cipher = EVP_aes_192_gcm()
+            elif key_buf.len == 32:
+                cipher = EVP_aes_256_gcm()
+            else:
+                raise ValueError("AESGCM key must be 128, 192, or 256 bits.")
+
+            self._enc = EVP_CIPHER_CTX_new()
+            self._dec = EVP_CIPHER_CTX_new()
+            if self._enc is NULL or self._dec is NULL:
+                raise MemoryError()
+            if (EVP_EncryptInit_ex(self._enc, cipher, NULL, <const unsigned char *>key_buf.buf, NULL) != 1
+                    or EVP_DecryptInit_ex(self._dec, cipher, NULL, <const unsigned char *>key_buf.buf, NULL) != 1):
+                raise RuntimeError("Failed to initialize AES-GCM context")
+            self._enc_nonce_length = DEFAULT_NONCE_LENGTH
+            self._dec_nonce_length = DEFAULT_NONCE_LENGTH
+        finally:
+            PyBuffer_Release(&key_buf)
+
+    def __dealloc__(self):
+        # EVP_CIPHER_CTX_free also cleanses the expanded key
+        EVP_CIPHER_CTX_free(self._enc)
+        EVP_CIPHER_CTX_free(self._dec)
+
+    def encrypt(self, nonce, data, associated_data=None) -> bytes:
+        """Encrypt ``data`` and return ciphertext followed by the tag."""
+        cdef Py_buffer nonce_buf, data_buf, ad_buf
+        cdef int outl, n
+        cdef bytes out
+        cdef unsigned char *buf
+        _get_buffers(nonce, &nonce_buf, data, &data_buf, associated_data, &ad_buf)
+        try:
+            n = _check_lengths(&nonce_buf, data_buf.len, &ad_buf)
+            out = PyBytes_FromStringAndSize(NULL, n + TAG_LENGTH)
+            buf = <unsigned char *>PyBytes_AS_STRING(out)
+
+            if nonce_buf.len != self._enc_nonce_length:
+                if EVP_CIPHER_CTX_ctrl(self._enc, EVP_CTRL_GCM_SET_IVLEN, <int>nonce_buf.len, NULL) != 1:
+                    raise RuntimeError("Failed to set AES-GCM nonce")
+                self._enc_nonce_length = <int>nonce_buf.len
+            if EVP_EncryptInit_ex(self._enc, NULL, NULL, NULL, <const unsigned char *>nonce_buf.buf) != 1:
+                raise RuntimeError("Failed to set AES-GCM nonce")
+            if ad_buf.len and EVP_EncryptUpdate(self._enc, NULL, &outl,
+                                                <const unsigned char *>ad_buf.buf, <int>ad_buf.len) != 1:
+                raise RuntimeError("AES-GCM encryption failed")
+            if (EVP_EncryptUpdate(self._enc, buf, &outl, <const unsigned char *>data_buf.buf, n) != 1
+                    or EVP_EncryptFinal_ex(self._enc, buf + outl, &outl) != 1
+                    or EVP_CIPHER_CTX_ctrl(self._enc, EVP_CTRL_GCM_GET_TAG, TAG_LENGTH, buf + n) != 1):
+                raise RuntimeError("AES-GCM encryption failed")
+            return out
+        finally:
+            _release_buffers(&nonce_buf, &data_buf, &ad_buf)
+
+    def decrypt(self, nonce, data, associated_data=None) -> bytes:
+        """Verify and decrypt ciphertext followed by the tag.
+
+        Raises:
+            InvalidTag: If the data was tampered with or the key is wrong
+        """
+        cdef Py_buffer nonce_buf, data_buf, ad_buf
+        cdef int outl, n
+        cdef bytes out
+        cdef unsigned char *buf
+        cdef const unsigned char *ciphertext
+        _get_buffers(nonce, &nonce_buf, data, &data_buf, associated_data, &ad_buf)
+        try:
+            if data_buf.len < TAG_LENGTH:
+                raise InvalidTag()
+            n = _check_lengths(&nonce_buf, data_buf.len - TAG_LENGTH, &ad_buf)
+            out = PyBytes_FromStringAndSize(NULL, n)
+            buf = <unsigned char *>PyBytes_AS_STRING(out)
+            ciphertext = <const unsigned char *>data_buf.buf
+
+            if nonce_buf.len != self._dec_nonce_length:
+                if EVP_CIPHER_CTX_ctrl(self._dec, EVP_CTRL_GCM_SET_IVLEN, <int>nonce_buf.len, NULL) != 1:
+                    raise RuntimeError("Failed to set AES-GCM nonce")
+                self._dec_nonce_length = <int>nonce_buf.len
+            if EVP_DecryptInit_ex(self._dec, NULL, NULL, NULL, <const unsigned char *>nonce_buf.buf) != 1:
+                raise RuntimeError("Failed to set AES-GCM nonce")
+            if ad_buf.len and EVP_DecryptUpdate(self._dec, NULL, &outl,
+                                                <const unsigned char *>ad_buf.buf, <int>ad_buf.len) != 1:
+                raise RuntimeError("AES-GCM decryption failed")
+            if (EVP_DecryptUpdate(self._dec, buf, &outl, ciphertext, n) != 1
+                    or EVP_CIPHER_CTX_ctrl(self._dec, EVP_CTRL_GCM_SET_TAG, TAG_LENGTH,
+                                           <void *>(ciphertext + n)) != 1):
+                raise RuntimeError("AES-GCM decryption failed")
+            if EVP_DecryptFinal_ex(self._dec, buf + outl, &outl) != 1:
+                raise InvalidTag()
+            return out
+        finally:
+            _release_buffers(&nonce_buf, &data_buf, &ad_buf)
+
+
+cdef int _get_buffers(object nonce, Py_buffer *nonce_buf, object data, Py_buffer *data_buf,
+                      object associated_data, Py_buffer *ad_buf) except -1:
+    """Acquire the argument buffers; ad_buf is left empty when there is no AAD."""
+    # Zeroed buffers are no-ops for PyBuffer_Release, so all three can
+    # always be released together
+    memset(nonce_buf, 0, sizeof(Py_buffer))
+    memset(data_buf, 0, sizeof(Py_buffer))
+    memset(ad_buf, 0, sizeof(Py_buffer))
+    PyObject_GetBuffer(nonce, nonce_buf, PyBUF_SIMPLE)
+    try:
+        PyObject_GetBuffer(data, data_buf, PyBUF_SIMPLE)
+        if associated_data is not None:
+            PyObject_GetBuffer(associated_data, ad_buf, PyBUF_SIMPLE)
+    except BaseException:
+        _release_buffers(nonce_buf, data_buf, ad_buf)
+        raise
+    return 0
+
+
+cdef void _release_buffers(Py_buffer *nonce_buf, Py_buffer *data_buf, Py_buffer *ad_buf):
+    """Release the argument buffers acquired by _get_buffers."""
+    PyBuffer_Release(nonce_buf)
+    PyBuffer_Release(data_buf)
+    PyBuffer_Release(ad_buf)
+
+
+cdef int _check_lengths(Py_buffer *nonce_buf, Py_ssize_t n, Py_buffer *ad_buf) except -1:
+    """Validate argument sizes and return the payload length as a C int."""
+    if not 8 <= nonce_buf.len <= 128:
+        raise ValueError("Nonce must be between 8 and 128 bytes")
+    if n > MAX_LENGTH or ad_buf.len > MAX_LENGTH:
+        raise OverflowError("Data or associated data too long")
+    return <int>n
+
+
+def gcm_encrypt(key, nonce, data, associated_data=None) -> bytes:
+    """One-shot AES-GCM encryption; returns ciphertext followed by the tag."""
+    return GCMContext(key).encrypt(nonce, data, associated_data)
+
+
+def gcm_decrypt(key, nonce, data, associated_data=None) -> bytes:
+    """One-shot AES-GCM decryption of ciphertext followed by the tag."""
+    return GCMContext(key).decrypt(nonce, data, associated_data)
@@ -1,33 +1,115 @@
 """
 Secure Storage Implementation
 
-Provides encrypted storage using AES-256-GCM for data at rest.
-Uses environment variables for key management and PBKDF2 for key derivation.
+Provides encrypted storage using AES-256-GCM (or ChaCha20-Poly1305 on CPUs
+without AES instructions) for data at rest.
+Uses environment variables for key management and PBKDF2 (or HKDF for
+high-entropy master keys) for key derivation.
 """
 import os
-import json
+import io
+import mmap
+import struct
 import base64
+import binascii
 import hashlib
-import secrets
-from typing import Any, Dict, Optional, Union
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+from cryptography.hazmat.primitives.ciphers import Cipher, CipherContext, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.exceptions import InvalidTag
 import logging
+from .exceptions import EncryptionError, DecryptionError, StorageError
+from .utils import fsync_directory, has_aes_acceleration, json_dumps_bytes, json_loads
+
+try:
+    from ._fastgcm import GCMContext as _FastAESGCM
+except ImportError:  # Optional: native AES-GCM, built with `cythonize -i storage/_fastgcm.pyx`
+    _FastAESGCM = None
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class _NonceSource:
+    """Buffered CSPRNG that hands out nonces from one getrandom() call per 4 KiB.
+    
+    The buffer is discarded when the process forks, so a child never reuses
+    the parent's random bytes.
+    """
+    
+    BUFFER_SIZE = 4096
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buf = b''
+        self._offset = 0
+        self._pid = os.getpid()
+    
+    def take(self, n: int) -> bytes:
+        """Return ``n`` fresh random bytes."""
+        with self._lock:
+            if self._pid != os.getpid() or self._offset + n > len(self._buf):
+                self._buf = os.urandom(max(n, self.BUFFER_SIZE))
+                self._offset = 0
+                self._pid = os.getpid()
+            out = self._buf[self._offset:self._offset + n]
+            self._offset += n
+            return out
+    
+    def burn(self) -> None:
+        """Discard any buffered randomness."""
+        with self._lock:
+            self._buf = b''
+            self._offset = 0
+
+
 class SecureStorage:
     """Secure storage class that handles encryption/decryption of data."""
     
     # Constants
     SALT_LENGTH = 16
     NONCE_LENGTH = 12
+    TAG_LENGTH = 16  # AEAD authentication tag appended to the ciphertext
     KEY_LENGTH = 32  # 256 bits for AES-256
     ITERATIONS = 100000
+    KEY_CACHE_SIZE = 128  # Derived keys kept in memory per instance
+    CIPHER_CACHE_SIZE = 32  # Initialized AEAD objects kept per instance
+    STREAM_CHUNK_SIZE = 32 * 1024  # Bytes fed to the cipher per update() when streaming
+    
+    # Key derivation: PBKDF2 stretches password-like master keys, while a
+    # master key that is already high-entropy only needs HKDF. KDF_MODE is
+    # 'pbkdf2' (default), 'hkdf' or 'auto' (HKDF only for keys that are
+    # recognisably random, see _is_high_entropy).
+    KDF_PBKDF2 = 'pbkdf2'
+    KDF_HKDF = 'hkdf'
+    KDF_MODE = os.getenv('VAULTGPT_KDF_MODE', KDF_PBKDF2)
+    HKDF_INFO = b'vaultgpt-v1'
+    
+    # AEAD: AES-256-GCM where the CPU accelerates AES, ChaCha20-Poly1305
+    # (same key and nonce sizes) where software AES would be slow.
+    # AEAD_MODE is 'auto', 'aes-256-gcm' or 'chacha20-poly1305'.
+    # AES-GCM uses the optional _fastgcm extension when it has been built.
+    AEAD_AES_GCM = 'aes-256-gcm'
+    AEAD_CHACHA20 = 'chacha20-poly1305'
+    AEAD_MODE = os.getenv('VAULTGPT_AEAD', 'auto')
+    _AEADS = {AEAD_AES_GCM: _FastAESGCM or AESGCM, AEAD_CHACHA20: ChaCha20Poly1305}
+    
+    # Binary format: FILE_MAGIC, header, salt, nonce, ciphertext, tag.
+    # v1 header: version, salt length, nonce length (always PBKDF2/AES-GCM).
+    # v2 header: version, KDF id, cipher id, salt length, nonce length.
+    FILE_MAGIC = b'VGPT'
+    FORMAT_VERSION = 2
+    _HEADERS = {1: struct.Struct('<BHH'), 2: struct.Struct('<BBBHH')}
+    _KDF_IDS = {KDF_PBKDF2: 0, KDF_HKDF: 1}
+    _KDF_NAMES = {kdf_id: name for name, kdf_id in _KDF_IDS.items()}
+    _AEAD_IDS = {AEAD_AES_GCM: 0, AEAD_CHACHA20: 1}
+    _AEAD_NAMES = {aead_id: name for name, aead_id in _AEAD_IDS.items()}
     
     def __init__(self, key_env_var: str = 'VAULTGPT_ENCRYPTION_KEY'):
         """Initialize the secure storage with encryption key from environment.
@@ -36,34 +118,205 @@ class SecureStorage:
             key_env_var: Environment variable name containing the encryption key
         """
         self.key_env_var = key_env_var
+        # Derived keys by (KDF, master key fingerprint, salt), most recently used last
+        self._key_cache: "OrderedDict[Tuple[str, bytes, bytes], bytes]" = OrderedDict()
+        # AEAD objects by (algorithm, derived key), so key setup happens once
+        self._cipher_cache: "OrderedDict[Tuple[str, bytes], Union[AESGCM, ChaCha20Poly1305]]" = OrderedDict()
+        # One salt per instance: the key is derived once and every message
+        # gets a fresh nonce, which is all AES-GCM requires under a fixed key
+        self._salt = os.urandom(self.SALT_LENGTH)
+        self._nonces = _NonceSource()
         self._validate_environment()
     
+    def __del__(self):
+        """Drop cached key material when the instance goes away."""
+        self._key_cache.clear()
+        self._cipher_cache.clear()
+        self._nonces.burn()
+    
     def _validate_environment(self) -> None:
         """Validate that required environment variables are set."""
         if not os.getenv(self.key_env_var):
             raise EnvironmentError(
                 f"Encryption key not found in environment variable: {self.key_env_var}"
             )
+        if self.KDF_MODE not in ('auto', self.KDF_PBKDF2, self.KDF_HKDF):
+            raise EnvironmentError(f"Unsupported key derivation mode: {self.KDF_MODE}")
+        if self.AEAD_MODE not in ('auto', self.AEAD_AES_GCM, self.AEAD_CHACHA20):
+            raise EnvironmentError(f"Unsupported cipher: {self.AEAD_MODE}")
+    
+    @staticmethod
+    def _is_high_entropy(master_key: str) -> bool:
+        """Check whether the master key is recognisably a random key, not a password.
+        
+        Only keys marked as encoded random bytes ('hex:...' or 'base64:...'
+        decoding to at least 128 bits) or bare hex of at least 256 bits
+        qualify. Long passphrases can look like valid base64, so unmarked
+        base64 is never trusted.
+        """
+        try:
+            if master_key.startswith('hex:'):
+                return len(bytes.fromhex(master_key[4:])) >= 16
+            if master_key.startswith('base64:'):
+                return len(base64.b64decode(master_key[7:], validate=True)) >= 16
+            return len(bytes.fromhex(master_key)) >= 32
+        except (binascii.Error, ValueError):
+            return False
+    
+    def _encryption_kdf(self) -> str:
+        """Pick the KDF used for newly encrypted data."""
+        if self.KDF_MODE != 'auto':
+            return self.KDF_MODE
+        if self._is_high_entropy(os.environ[self.key_env_var]):
+            return self.KDF_HKDF
+        return self.KDF_PBKDF2
     
-    def _derive_key(self, salt: bytes) -> bytes:
+    def _encryption_aead(self) -> str:
+        """Pick the AEAD used for newly encrypted data."""
+        if self.AEAD_MODE != 'auto':
+            return self.AEAD_MODE
+        return self.AEAD_AES_GCM if has_aes_acceleration() else self.AEAD_CHACHA20
+    
+    def _derive_key(self, salt: bytes, kdf: str = KDF_PBKDF2) -> bytes:
         """Derive a secure encryption key from the master key and salt.
         
+        PBKDF2 is deliberately slow, so derived keys are cached per
+        (KDF, master key, salt). The cache is keyed by a BLAKE2b fingerprint
+        of the master key rather than the key itself, and a changed master
+        key simply misses the cache.
+        
         Args:
             salt: Random salt for key derivation
+            kdf: Key derivation function (KDF_PBKDF2 or KDF_HKDF)
             
         Returns:
             Derived encryption key
         """
         master_key = os.environ[self.key_env_var].encode()
-        kdf = PBKDF2HMAC(
+        cache_key = (kdf, hashlib.blake2b(master_key, digest_size=16).digest(), salt)
+        key = self._key_cache.get(cache_key)
+        if key is not None:
+            self._key_cache.move_to_end(cache_key)
+            return key
+        
+        key = self._derive_key_uncached(master_key, salt, kdf)
+        self._key_cache[cache_key] = key
+        if len(self._key_cache) > self.KEY_CACHE_SIZE:
+            self._key_cache.popitem(last=False)
+        return key
+    
+    @classmethod
+    def _derive_key_uncached(cls, master_key: bytes, salt: bytes, kdf: str) -> bytes:
+        """Run the given KDF over the master key and salt."""
+        if kdf == cls.KDF_HKDF:
+            return HKDF(
+                algorithm=hashes.SHA256(),
+                length=cls.KEY_LENGTH,
+                salt=salt,
+                info=cls.HKDF_INFO,
+            ).derive(master_key)
+        if kdf != cls.KDF_PBKDF2:
+            raise ValueError(f"Unsupported key derivation function: {kdf}")
+        # PBKDF2HMAC.derive() runs the whole iteration loop in one call into
+        # the OpenSSL bundled with cryptography, which uses the CPU's SHA
+        # extensions where available; hashlib.pbkdf2_hmac links the system
+        # OpenSSL instead and is not faster.
+        pbkdf2 = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
-            length=self.KEY_LENGTH,
+            length=cls.KEY_LENGTH,
             salt=salt,
-            iterations=self.ITERATIONS,
+            iterations=cls.ITERATIONS,
         )
-        return kdf.derive(master_key)
+        return pbkdf2.derive(master_key)
     
-    def encrypt_data(self, data: Union[Dict, str, bytes]) -> Dict[str, str]:
+    def _get_cipher(self, salt: bytes, kdf: str = KDF_PBKDF2,
+                    aead: str = AEAD_AES_GCM) -> Union[AESGCM, ChaCha20Poly1305]:
+        """Get an AEAD cipher for the key derived from ``salt``.
+        
+        Args:
+            salt: Salt the key is derived from
+            kdf: Key derivation function the key is derived with
+            aead: AEAD algorithm (AEAD_AES_GCM or AEAD_CHACHA20)
+            
+        Returns:
+            AESGCM or ChaCha20Poly1305 instance, reused across calls for the same key
+        """
+        aead_class = self._AEADS.get(aead)
+        if aead_class is None:
+            raise ValueError(f"Unsupported cipher: {aead}")
+        key = self._derive_key(salt, kdf)
+        cache_key = (aead, key)
+        cipher = self._cipher_cache.get(cache_key)
+        if cipher is not None:
+            self._cipher_cache.move_to_end(cache_key)
+            return cipher
+        
+        cipher = aead_class(key)
+        self._cipher_cache[cache_key] = cipher
+        if len(self._cipher_cache) > self.CIPHER_CACHE_SIZE:
+            self._cipher_cache.popitem(last=False)
+        return cipher
+    
+    def _gcm_context(self, salt: bytes, nonce: bytes, encrypt: bool = True,
+                     kdf: str = KDF_PBKDF2) -> CipherContext:
+        """Create an incremental AES-GCM encryptor or decryptor.
+        
+        Unlike the one-shot AESGCM API, the context accepts data in pieces
+        through update()/update_into(), so large payloads can be processed
+        without holding them in memory. An encryptor's output followed by
+        its ``tag`` has the same layout as AESGCM.encrypt, so either API can
+        decrypt the other's output. Decryptors are finished with
+        finalize_with_tag().
+        
+        Args:
+            salt: Salt the key is derived from
+            nonce: Per-message nonce
+            encrypt: Whether to create an encryptor (True) or decryptor (False)
+            kdf: Key derivation function the key is derived with
+            
+        Returns:
+            Cipher context for the derived key
+        """
+        cipher = Cipher(algorithms.AES(self._derive_key(salt, kdf)), modes.GCM(nonce))
+        return cipher.encryptor() if encrypt else cipher.decryptor()
+    
+    @staticmethod
+    def _to_bytes(data: Union[Dict, str, bytes]) -> bytes:
+        """Convert data to bytes for encryption."""
+        # Exact-type checks first for the common cases, then the isinstance
+        # ladder for subclasses
+        data_type = type(data)
+        if data_type is bytes:
+            return data
+        if data_type is str:
+            return data.encode('utf-8')
+        if data_type is dict:
+            return json_dumps_bytes(data)
+        
+        # Convert data to bytes if it's a string
+        if isinstance(data, str):
+            return data.encode('utf-8')
+        elif isinstance(data, dict):
+            return json_dumps_bytes(data)
+        else:
+            return data
+    
+    @staticmethod
+    def _decode_plaintext(decrypted_data: bytes) -> Union[Dict, str, bytes]:
+        """Restore decrypted bytes to their original format."""
+        # Try to parse as JSON straight from bytes (no intermediate str),
+        # otherwise return as string, or as bytes if it isn't UTF-8.
+        # JSONDecodeError and UnicodeDecodeError are both ValueErrors.
+        try:
+            return json_loads(decrypted_data)
+        except ValueError:
+            pass
+        try:
+            return decrypted_data.decode('utf-8')
+        except UnicodeDecodeError:
+            return decrypted_data
+    
+    def encrypt_data(self, data: Union[Dict, str, bytes]) -> Dict[str, Any]:
         """Encrypt the provided data.
         
         Args:
@@ -76,45 +329,66 @@ class SecureStorage:
             EncryptionError: If encryption fails
         """
         try:
-            # Convert data to bytes if it's a string
-            if isinstance(data, str):
-                data_bytes = data.encode('utf-8')
-            elif isinstance(data, dict):
-                data_bytes = json.dumps(data).encode('utf-8')
-            else:
-                data_bytes = data
-            
-            # Generate random salt and nonce
-            salt = secrets.token_bytes(self.SALT_LENGTH)
-            nonce = secrets.token_bytes(self.NONCE_LENGTH)
-            
-            # Derive key and initialize cipher
-            key = self._derive_key(salt)
-            aesgcm = AESGCM(key)
+            data_bytes = self._to_bytes(data)
+            
+            # Reuse the instance salt (and its cached key); only the nonce is fresh
+            salt = self._salt
+            nonce = self._nonces.take(self.NONCE_LENGTH)
+            kdf = self._encryption_kdf()
+            aead = self._encryption_aead()
+            
+            # Derive key and initialize cipher (both cached)
+            cipher = self._get_cipher(salt, kdf, aead)
             
             # Encrypt the data
-            encrypted_data = aesgcm.encrypt(
+            encrypted_data = cipher.encrypt(
                 nonce=nonce,
                 data=data_bytes,
                 associated_data=None
             )
             
-            # Return as base64-encoded strings for easy storage
+            # Return salt, nonce and ciphertext as one base64 string for easy storage
             return {
-                'ciphertext': base64.b64encode(encrypted_data).decode('utf-8'),
-                'salt': base64.b64encode(salt).decode('utf-8'),
-                'nonce': base64.b64encode(nonce).decode('utf-8')
+                'blob': base64.b64encode(salt + nonce + encrypted_data).decode('utf-8'),
+                'sl': len(salt),
+                'nl': len(nonce),
+                'kdf': kdf,
+                'alg': aead
             }
             
         except Exception as e:
             logger.error(f"Encryption failed: {str(e)}")
             raise EncryptionError(f"Failed to encrypt data: {str(e)}")
     
-    def decrypt_data(self, encrypted_data: Dict[str, str]) -> Union[Dict, str, bytes]:
+    @staticmethod
+    def _unpack_envelope(encrypted_data: Dict[str, Any]) -> Tuple[bytes, bytes, memoryview]:
+        """Split an encrypt_data dictionary into (salt, nonce, ciphertext).
+        
+        Accepts both the single 'blob' format and the older format with
+        separate 'ciphertext', 'salt' and 'nonce' fields. The ciphertext is
+        returned as a memoryview over the decoded base64, so it is handed to
+        the cipher without another copy.
+        """
+        if 'blob' not in encrypted_data:
+            return (
+                binascii.a2b_base64(encrypted_data['salt']),
+                binascii.a2b_base64(encrypted_data['nonce']),
+                memoryview(binascii.a2b_base64(encrypted_data['ciphertext']))
+            )
+        raw = memoryview(binascii.a2b_base64(encrypted_data['blob']))
+        salt_end = encrypted_data['sl']
+        nonce_end = salt_end + encrypted_data['nl']
+        return bytes(raw[:salt_end]), bytes(raw[salt_end:nonce_end]), raw[nonce_end:]
+    
+    def decrypt_data(self, encrypted_data: Dict[str, Any]) -> Union[Dict, str, bytes]:
         """Decrypt the provided encrypted data.
         
         Args:
-            encrypted_data: Dictionary containing 'ciphertext', 'salt', and 'nonce'
+            encrypted_data: Dictionary returned by encrypt_data: 'blob' (base64
+                of salt + nonce + ciphertext), 'sl' and 'nl' (salt and nonce
+                lengths), or the older 'ciphertext', 'salt' and 'nonce'; plus
+                optionally 'kdf' (PBKDF2 when absent) and 'alg' (AES-256-GCM
+                when absent)
             
         Returns:
             Decrypted data (original format)
@@ -123,27 +397,21 @@ class SecureStorage:
             DecryptionError: If decryption fails or authentication fails
         """
         try:
-            # Decode base64 strings
-            ciphertext = base64.b64decode(encrypted_data['ciphertext'])
-            salt = base64.b64decode(encrypted_data['salt'])
-            nonce = base64.b64decode(encrypted_data['nonce'])
+            salt, nonce, ciphertext = self._unpack_envelope(encrypted_data)
+            kdf = encrypted_data.get('kdf', self.KDF_PBKDF2)
+            aead = encrypted_data.get('alg', self.AEAD_AES_GCM)
             
-            # Derive key and initialize cipher
-            key = self._derive_key(salt)
-            aesgcm = AESGCM(key)
+            # Derive key and initialize cipher (both cached)
+            cipher = self._get_cipher(salt, kdf, aead)
             
             # Decrypt the data
-            decrypted_data = aesgcm.decrypt(
+            decrypted_data = cipher.decrypt(
                 nonce=nonce,
                 data=ciphertext,
                 associated_data=None
             )
             
-            # Try to decode as JSON, otherwise return as bytes/string
-            try:
-                return json.loads(decoded:=decrypted_data.decode('utf-8'))
-            except (UnicodeDecodeError, json.JSONDecodeError):
-                return decoded if 'decoded' in locals() else decrypted_data
+            return self._decode_plaintext(decrypted_data)
                 
         except InvalidTag as e:
             logger.error("Decryption failed: Authentication tag verification failed")
@@ -152,26 +420,332 @@ class SecureStorage:
             logger.error(f"Decryption failed: {str(e)}")
             raise DecryptionError(f"Failed to decrypt data: {str(e)}")
 
-    def store_encrypted(self, data: Any, storage_path: str) -> None:
+    def encrypt_many(self, items: List[Union[Dict, str, bytes]]) -> List[Dict[str, Any]]:
+        """Encrypt many small items with a single key and cipher.
+        
+        The key is derived and the cipher initialized once for the batch.
+        Each nonce is a random 8-byte batch prefix followed by a 4-byte
+        big-endian counter, so nonces never repeat within the batch.
+        
+        Args:
+            items: Data items to encrypt (dict, str, or bytes)
+            
+        Returns:
+            List of dictionaries in the same format as encrypt_data
+            
+        Raises:
+            EncryptionError: If encryption fails
+        """
+        try:
+            if len(items) > 0xFFFFFFFF:
+                raise ValueError("Too many items for a single batch")
+            
+            salt = self._salt
+            kdf = self._encryption_kdf()
+            aead = self._encryption_aead()
+            cipher = self._get_cipher(salt, kdf, aead)
+            prefix = self._nonces.take(self.NONCE_LENGTH - 4)
+            
+            results = []
+            for counter, item in enumerate(items):
+                nonce = prefix + counter.to_bytes(4, 'big')
+                encrypted_data = cipher.encrypt(nonce, self._to_bytes(item), None)
+                results.append({
+                    'blob': base64.b64encode(salt + nonce + encrypted_data).decode('utf-8'),
+                    'sl': len(salt),
+                    'nl': len(nonce),
+                    'kdf': kdf,
+                    'alg': aead
+                })
+            return results
+            
+        except Exception as e:
+            logger.error(f"Batch encryption failed: {str(e)}")
+            raise EncryptionError(f"Failed to encrypt data: {str(e)}")
+    
+    def decrypt_many(self, items: List[Dict[str, Any]]) -> List[Union[Dict, str, bytes]]:
+        """Decrypt many items produced by encrypt_many or encrypt_data.
+        
+        Items that share a salt, KDF and algorithm reuse one key and cipher.
+        
+        Args:
+            items: Dictionaries in the format returned by encrypt_data
+            
+        Returns:
+            Decrypted items, in order
+            
+        Raises:
+            DecryptionError: If decryption fails or authentication fails
+        """
+        try:
+            ciphers: Dict[Tuple[bytes, str, str], Union[AESGCM, ChaCha20Poly1305]] = {}
+            results = []
+            for encrypted_data in items:
+                salt, nonce, ciphertext = self._unpack_envelope(encrypted_data)
+                kdf = encrypted_data.get('kdf', self.KDF_PBKDF2)
+                aead = encrypted_data.get('alg', self.AEAD_AES_GCM)
+                cipher_key = (salt, kdf, aead)
+                cipher = ciphers.get(cipher_key)
+                if cipher is None:
+                    cipher = self._get_cipher(salt, kdf, aead)
+                    ciphers[cipher_key] = cipher
+                
+                decrypted_data = cipher.decrypt(nonce, ciphertext, None)
+                results.append(self._decode_plaintext(decrypted_data))
+            return results
+            
+        except InvalidTag as e:
+            logger.error("Batch decryption failed: Authentication tag verification failed")
+            raise DecryptionError("Authentication failed - data may have been tampered with")
+        except Exception as e:
+            logger.error(f"Batch decryption failed: {str(e)}")
+            raise DecryptionError(f"Failed to decrypt data: {str(e)}")
+
+    def _pack_header(self, kdf: str, aead: str, salt: bytes, nonce: bytes) -> bytes:
+        """Build the binary-format prefix up to and including the nonce."""
+        header = self._HEADERS[self.FORMAT_VERSION].pack(
+            self.FORMAT_VERSION, self._KDF_IDS[kdf], self._AEAD_IDS[aead], len(salt), len(nonce)
+        )
+        return self.FILE_MAGIC + header + salt + nonce
+    
+    def _read_header(self, read: Callable[[int], bytes]) -> Tuple[str, str, bytes, bytes]:
+        """Read and validate the binary-format prefix up to and including the nonce.
+        
+        Args:
+            read: Callable returning up to the requested number of bytes
+            
+        Returns:
+            Tuple of (KDF, AEAD, salt, nonce)
+        """
+        prefix = read(len(self.FILE_MAGIC) + 1)
+        if len(prefix) != len(self.FILE_MAGIC) + 1 or prefix[:-1] != self.FILE_MAGIC:
+            raise ValueError("Not an encrypted VaultGPT stream")
+        version = prefix[-1]
+        header_format = self._HEADERS.get(version)
+        if header_format is None:
+            raise ValueError(f"Unsupported format version: {version}")
+        header = prefix[-1:] + read(header_format.size - 1)
+        if len(header) != header_format.size:
+            raise ValueError("Encrypted data is truncated")
+        
+        if version == 1:
+            _, salt_length, nonce_length = header_format.unpack(header)
+            kdf, aead = self.KDF_PBKDF2, self.AEAD_AES_GCM
+        else:
+            _, kdf_id, aead_id, salt_length, nonce_length = header_format.unpack(header)
+            if kdf_id not in self._KDF_NAMES or aead_id not in self._AEAD_NAMES:
+                raise ValueError(f"Unsupported KDF or cipher id: {kdf_id}, {aead_id}")
+            kdf, aead = self._KDF_NAMES[kdf_id], self._AEAD_NAMES[aead_id]
+        
+        salt = read(salt_length)
+        nonce = read(nonce_length)
+        if len(salt) != salt_length or len(nonce) != nonce_length:
+            raise ValueError("Encrypted data is truncated")
+        return kdf, aead, salt, nonce
+    
+    def encrypt_stream(self, reader: BinaryIO, writer: BinaryIO) -> None:
+        """Encrypt everything read from ``reader`` into ``writer``.
+        
+        With AES-GCM the plaintext is fed to the cipher in STREAM_CHUNK_SIZE
+        pieces, so it never has to be held in memory at once. ChaCha20-Poly1305
+        has no incremental API and encrypts the whole input in one call. The
+        output uses the binary format (header, salt, nonce, ciphertext, tag)
+        with no base64.
+        
+        Args:
+            reader: Binary file-like object providing the plaintext
+            writer: Binary file-like object receiving the encrypted output
+            
+        Raises:
+            EncryptionError: If encryption fails
+        """
+        try:
+            salt = self._salt
+            nonce = self._nonces.take(self.NONCE_LENGTH)
+            kdf = self._encryption_kdf()
+            aead = self._encryption_aead()
+            
+            writer.write(self._pack_header(kdf, aead, salt, nonce))
+            if aead != self.AEAD_AES_GCM:
+                writer.write(self._get_cipher(salt, kdf, aead).encrypt(nonce, reader.read(), None))
+                return
+            
+            encryptor = self._gcm_context(salt, nonce, kdf=kdf)
+            while chunk := reader.read(self.STREAM_CHUNK_SIZE):
+                writer.write(encryptor.update(chunk))
+            writer.write(encryptor.finalize())
+            writer.write(encryptor.tag)
+            
+        except Exception as e:
+            logger.error(f"Encryption failed: {str(e)}")
+            raise EncryptionError(f"Failed to encrypt data: {str(e)}")
+    
+    def decrypt_stream(self, reader: BinaryIO, writer: BinaryIO) -> None:
+        """Decrypt a stream written by encrypt_stream into ``writer``.
+        
+        Plaintext is written as it is decrypted and the tag is only verified
+        at the end, so on DecryptionError whatever reached ``writer`` must be
+        discarded.
+        
+        Args:
+            reader: Binary file-like object positioned at the start of the data
+            writer: Binary file-like object receiving the plaintext
+            
+        Raises:
+            DecryptionError: If decryption fails or authentication fails
+        """
+        try:
+            kdf, aead, salt, nonce = self._read_header(reader.read)
+            if aead != self.AEAD_AES_GCM:
+                writer.write(self._get_cipher(salt, kdf, aead).decrypt(nonce, reader.read(), None))
+                return
+            
+            decryptor = self._gcm_context(salt, nonce, encrypt=False, kdf=kdf)
+            
+            # Hold back the last TAG_LENGTH bytes seen, which end up being the tag
+            tail = b''
+            while chunk := reader.read(self.STREAM_CHUNK_SIZE):
+                data = tail + chunk
+                writer.write(decryptor.update(data[:-self.TAG_LENGTH]))
+                tail = data[-self.TAG_LENGTH:]
+            if len(tail) != self.TAG_LENGTH:
+                raise ValueError("Encrypted stream is truncated")
+            writer.write(decryptor.finalize_with_tag(tail))
+            
+        except InvalidTag as e:
+            logger.error("Decryption failed: Authentication tag verification failed")
+            raise DecryptionError("Authentication failed - data may have been tampered with")
+        except Exception as e:
+            logger.error(f"Decryption failed: {str(e)}")
+            raise DecryptionError(f"Failed to decrypt data: {str(e)}")
+    
+    def store_encrypted_binary(self, data: bytes, storage_path: str, atomic: bool = True) -> None:
+        """Encrypt raw bytes to a file in the binary format, with no base64.
+        
+        The file is written to a uniquely named temporary file (mode 0o600)
+        in the same directory and renamed over ``storage_path``, so readers
+        never see a partial file and concurrent writers never share one.
+        
+        Args:
+            data: Bytes to encrypt and store
+            storage_path: Path to store the encrypted data
+            atomic: Whether to fsync the file before the rename and its
+                directory after it, so the new contents survive a crash;
+                pass False to trade durability for throughput
+            
+        Raises:
+            StorageError: If storage operation fails
+        """
+        directory = os.path.dirname(storage_path) or '.'
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory, prefix=os.path.basename(storage_path) + '.', suffix='.tmp'
+            )
+            with os.fdopen(fd, 'wb') as f:
+                self.encrypt_stream(io.BytesIO(data), f)
+                if atomic:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, storage_path)
+            tmp_path = None
+            if atomic:
+                fsync_directory(directory)
+        except Exception as e:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            raise StorageError(f"Failed to store encrypted data: {str(e)}")
+    
+    def load_encrypted_binary(self, storage_path: str) -> bytes:
+        """Load and decrypt a file written in the binary format.
+        
+        The file is memory-mapped and the ciphertext handed to the cipher as
+        a memoryview, so it is never copied into an intermediate bytes object.
+        
+        Args:
+            storage_path: Path to the encrypted data file
+            
+        Returns:
+            Decrypted bytes
+            
+        Raises:
+            StorageError: If storage operation fails
+        """
+        try:
+            with open(storage_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                    memoryview(mapped) as view:
+                return self._decrypt_buffer(view)
+        except Exception as e:
+            raise StorageError(f"Failed to load encrypted data: {str(e)}")
+    
+    def _decrypt_buffer(self, view: memoryview) -> bytes:
+        """Decrypt a complete binary-format payload held in memory.
+        
+        Args:
+            view: The whole encrypted payload
+            
+        Returns:
+            Decrypted bytes
+            
+        Raises:
+            DecryptionError: If decryption fails or authentication fails
+        """
+        try:
+            offset = 0
+            
+            def read(size: int) -> bytes:
+                nonlocal offset
+                chunk = bytes(view[offset:offset + size])
+                offset += len(chunk)
+                return chunk
+            
+            kdf, aead, salt, nonce = self._read_header(read)
+            if len(view) - offset < self.TAG_LENGTH:
+                raise ValueError("Encrypted data is truncated")
+            if aead != self.AEAD_AES_GCM:
+                return self._get_cipher(salt, kdf, aead).decrypt(nonce, view[offset:], None)
+            
+            decryptor = self._gcm_context(salt, nonce, encrypt=False, kdf=kdf)
+            plaintext = decryptor.update(view[offset:-self.TAG_LENGTH])
+            return plaintext + decryptor.finalize_with_tag(bytes(view[-self.TAG_LENGTH:]))
+            
+        except InvalidTag as e:
+            logger.error("Decryption failed: Authentication tag verification failed")
+            raise DecryptionError("Authentication failed - data may have been tampered with")
+        except Exception as e:
+            logger.error(f"Decryption failed: {str(e)}")
+            raise DecryptionError(f"Failed to decrypt data: {str(e)}")
+    
+    def store_encrypted(self, data: Any, storage_path: str, atomic: bool = True) -> None:
         """Store encrypted data to a file.
         
+        Thin wrapper around store_encrypted_binary.
+        
         Args:
             data: Data to encrypt and store
             storage_path: Path to store the encrypted data
+            atomic: Whether to fsync before replacing the file
             
         Raises:
             StorageError: If storage operation fails
         """
         try:
-            encrypted = self.encrypt_data(data)
-            with open(storage_path, 'w') as f:
-                json.dump(encrypted, f)
+            self.store_encrypted_binary(self._to_bytes(data), storage_path, atomic)
+        except StorageError:
+            raise
         except Exception as e:
             raise StorageError(f"Failed to store encrypted data: {str(e)}")
     
     def load_encrypted(self, storage_path: str) -> Any:
         """Load and decrypt data from a file.
         
+        Thin wrapper around load_encrypted_binary that also reads the older
+        base64 JSON files.
+        
         Args:
             storage_path: Path to the encrypted data file
             
@@ -182,8 +756,15 @@ class SecureStorage:
             StorageError: If storage operation fails
         """
         try:
-            with open(storage_path, 'r') as f:
-                encrypted = json.load(f)
+            with open(storage_path, 'rb') as f:
+                is_binary = f.read(len(self.FILE_MAGIC)) == self.FILE_MAGIC
+                if not is_binary:
+                    f.seek(0)
+                    encrypted = json_loads(f.read())
+            if is_binary:
+                return self._decode_plaintext(self.load_encrypted_binary(storage_path))
             return self.decrypt_data(encrypted)
+        except StorageError:
+            raise
         except Exception as e:
             raise StorageError(f"Failed to load encrypted data: {str(e)}")
@@ -0,0 +1,179 @@
+"""
+Round-trip and tamper tests for SecureStorage's dict, file and stream formats.
+"""
+import base64
+import io
+import json
+import os
+import struct
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from storage import DecryptionError, SecureStorage, StorageError
+
+MASTER_KEY = 'test-master-key'
+PAYLOADS = [{'a': 1, 'b': [1, 2.5, None]}, {'a': '\ud800'}, {'n': 2 ** 70}, 'hello', b'\xff\x00raw']
+
+
+def legacy_key(salt: bytes) -> bytes:
+    """Derive a key the way the original implementation did."""
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=100000)
+    return kdf.derive(MASTER_KEY.encode())
+
+
+def legacy_parts(plaintext: bytes):
+    """Encrypt like the original implementation: (salt, nonce, ciphertext + tag)."""
+    salt, nonce = os.urandom(16), os.urandom(12)
+    return salt, nonce, AESGCM(legacy_key(salt)).encrypt(nonce, plaintext, None)
+
+
+def flip_last_byte(data: bytes) -> bytes:
+    return data[:-1] + bytes([data[-1] ^ 1])
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setenv('VAULTGPT_ENCRYPTION_KEY', MASTER_KEY)
+    return SecureStorage()
+
+
+@pytest.fixture(params=[SecureStorage.AEAD_AES_GCM, SecureStorage.AEAD_CHACHA20])
+def any_aead_storage(storage, request):
+    storage.AEAD_MODE = request.param
+    return storage
+
+
+@pytest.mark.parametrize('data', PAYLOADS)
+def test_dict_round_trip(any_aead_storage, data):
+    encrypted = any_aead_storage.encrypt_data(data)
+    assert encrypted['alg'] == any_aead_storage.AEAD_MODE
+    assert any_aead_storage.decrypt_data(encrypted) == data
+
+
+def test_dict_tampering_is_detected(storage):
+    encrypted = storage.encrypt_data({'a': 1})
+    raw = flip_last_byte(base64.b64decode(encrypted['blob']))
+    encrypted['blob'] = base64.b64encode(raw).decode()
+    with pytest.raises(DecryptionError):
+        storage.decrypt_data(encrypted)
+
+
+def test_legacy_dict_envelope(storage):
+    salt, nonce, ciphertext = legacy_parts(json.dumps({'a': 1}).encode())
+    envelope = {
+        'ciphertext': base64.b64encode(ciphertext).decode(),
+        'salt': base64.b64encode(salt).decode(),
+        'nonce': base64.b64encode(nonce).decode(),
+    }
+    assert storage.decrypt_data(envelope) == {'a': 1}
+    assert storage.decrypt_many([envelope]) == [{'a': 1}]
+
+
+def test_legacy_json_file(storage, tmp_path):
+    salt, nonce, ciphertext = legacy_parts(b'legacy text')
+    path = tmp_path / 'legacy.dat'
+    path.write_text(json.dumps({
+        'ciphertext': base64.b64encode(ciphertext).decode(),
+        'salt': base64.b64encode(salt).decode(),
+        'nonce': base64.b64encode(nonce).decode(),
+    }))
+    assert storage.load_encrypted(str(path)) == 'legacy text'
+
+
+def test_v1_binary_file(storage, tmp_path):
+    salt, nonce, ciphertext = legacy_parts(b'v1 payload')
+    path = tmp_path / 'v1.dat'
+    path.write_bytes(b'VGPT' + struct.pack('<BHH', 1, len(salt), len(nonce)) + salt + nonce + ciphertext)
+    assert storage.load_encrypted_binary(str(path)) == b'v1 payload'
+    assert storage.load_encrypted(str(path)) == 'v1 payload'
+
+
+@pytest.mark.parametrize('data', PAYLOADS)
+def test_v2_binary_file_round_trip(any_aead_storage, tmp_path, data):
+    path = str(tmp_path / 'v2.dat')
+    any_aead_storage.store_encrypted(data, path)
+    with open(path, 'rb') as f:
+        assert f.read(5) == b'VGPT\x02'
+    assert any_aead_storage.load_encrypted(path) == data
+    assert os.listdir(tmp_path) == ['v2.dat']
+
+
+def test_chacha_data_decrypts_with_aes_default(storage, tmp_path):
+    storage.AEAD_MODE = storage.AEAD_CHACHA20
+    encrypted = storage.encrypt_data('portable')
+    path = str(tmp_path / 'chacha.dat')
+    storage.store_encrypted('portable', path)
+
+    storage.AEAD_MODE = storage.AEAD_AES_GCM
+    assert storage.decrypt_data(encrypted) == 'portable'
+    assert storage.load_encrypted(path) == 'portable'
+
+
+@pytest.mark.parametrize('size', [0, 1, 16, 32 * 1024 - 1, 32 * 1024, 32 * 1024 + 1, 100000])
+def test_stream_round_trip_across_chunk_boundary(any_aead_storage, size):
+    data = os.urandom(size)
+    encrypted = io.BytesIO()
+    any_aead_storage.encrypt_stream(io.BytesIO(data), encrypted)
+
+    decrypted = io.BytesIO()
+    any_aead_storage.decrypt_stream(io.BytesIO(encrypted.getvalue()), decrypted)
+    assert decrypted.getvalue() == data
+
+
+@pytest.mark.parametrize('size', [0, 32 * 1024 + 1])
+def test_stream_tampering_and_truncation_are_detected(any_aead_storage, size):
+    encrypted = io.BytesIO()
+    any_aead_storage.encrypt_stream(io.BytesIO(os.urandom(size)), encrypted)
+    blob = encrypted.getvalue()
+    for corrupted in (flip_last_byte(blob), blob[:-1], blob[:10]):
+        with pytest.raises(DecryptionError):
+            any_aead_storage.decrypt_stream(io.BytesIO(corrupted), io.BytesIO())
+
+
+def test_truncated_file_is_rejected(storage, tmp_path):
+    path = str(tmp_path / 'data.dat')
+    storage.store_encrypted_binary(os.urandom(1000), path)
+    with open(path, 'rb') as f:
+        blob = f.read()
+    for cut in (len(blob) - 1, 30, 6):
+        with open(path, 'wb') as f:
+            f.write(blob[:cut])
+        with pytest.raises(StorageError):
+            storage.load_encrypted(path)
+
+
+def test_bad_magic_file_is_rejected(storage, tmp_path):
+    path = str(tmp_path / 'bad.dat')
+    storage.store_encrypted_binary(b'payload', path)
+    with open(path, 'rb') as f:
+        blob = f.read()
+    with open(path, 'wb') as f:
+        f.write(b'XXXX' + blob[4:])
+    with pytest.raises(StorageError):
+        storage.load_encrypted_binary(path)
+    with pytest.raises(StorageError):
+        storage.load_encrypted(path)
+
+
+def test_batch_round_trip(any_aead_storage):
+    items = [{'i': i} for i in range(100)] + ['text', b'\xff']
+    encrypted = any_aead_storage.encrypt_many(items)
+    assert len({e['blob'][:40] for e in encrypted}) == len(items)
+    assert any_aead_storage.decrypt_many(encrypted) == items
+
+
+def test_native_gcm_matches_aesgcm():
+    fastgcm = pytest.importorskip('storage._fastgcm')
+    key, aad = os.urandom(32), b'header'
+    ctx = fastgcm.GCMContext(key)
+    for size in (0, 1, 32 * 1024 + 1):
+        data, nonce = os.urandom(size), os.urandom(12)
+        blob = ctx.encrypt(nonce, data, aad)
+        assert blob == AESGCM(key).encrypt(nonce, data, aad)
+        assert ctx.decrypt(nonce, blob, aad) == data
+        with pytest.raises(InvalidTag):
+            ctx.decrypt(nonce, flip_last_byte(blob), aad)
@@ -2,11 +2,104 @@
 Utility functions for the secure storage module.
 """
 import os
+import re
+import sys
 import json
+import subprocess
+from functools import lru_cache
 from typing import Any, Dict, Optional, Union
-from pathlib import Path
 from .exceptions import StorageError
 
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON (de)serialization
+    orjson = None
+
+def json_dumps_bytes(data: Any, default=None) -> bytes:
+    """Serialize data to UTF-8 encoded JSON, using orjson when available.
+    
+    The result always decodes to what the json module would produce. orjson
+    rejects integers beyond 64 bits and objects it can't serialize (which
+    then go through the json module), and it writes NaN/Infinity as null, so
+    any output containing null is re-encoded with the json module as well.
+    
+    Args:
+        data: Data to serialize
+        default: Optional callable for objects JSON can't represent natively
+        
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(
+                data,
+                default=default,
+                option=(orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                        | orjson.OPT_PASSTHROUGH_DATACLASS)
+            )
+        except orjson.JSONEncodeError:
+            pass
+        else:
+            if b'null' not in encoded:
+                return encoded
+    return json.dumps(data, default=default).encode('utf-8')
+
+# orjson parses integers beyond 64 bits as floats; documents that may contain
+# one are parsed by the json module instead
+_ORJSON_UNSAFE = re.compile(rb'\d{19}')
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Deserialize JSON from bytes or str, using orjson when available.
+    
+    Args:
+        data: JSON document
+        
+    Returns:
+        Deserialized data
+    """
+    if orjson is not None:
+        raw = data.encode('utf-8', 'surrogatepass') if isinstance(data, str) else data
+        if not _ORJSON_UNSAFE.search(raw):
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                # orjson is stricter than json (NaN, Infinity, lone
+                # surrogates), so let json decide whether it's invalid
+                pass
+    return json.loads(data)
+
+@lru_cache(maxsize=1)
+def has_aes_acceleration() -> bool:
+    """Check whether the CPU has AES instructions (AES-NI / ARMv8 AES).
+    
+    Reads /proc/cpuinfo on Linux and sysctl on macOS. When the answer can't
+    be determined, AES acceleration is assumed.
+    
+    Returns:
+        bool: False only if the CPU is known to lack AES instructions
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/cpuinfo') as f:
+                for line in f:
+                    name, _, value = line.partition(':')
+                    if name.strip() in ('flags', 'Features'):
+                        return 'aes' in value.split()
+        except OSError:
+            pass
+    elif sys.platform == 'darwin':
+        for name, expected in (('hw.optional.arm.FEAT_AES', '1'), ('machdep.cpu.features', 'AES')):
+            try:
+                result = subprocess.run(
+                    ['sysctl', '-n', name], capture_output=True, text=True, timeout=2
+                )
+            except (OSError, subprocess.SubprocessError):
+                continue
+            if result.returncode == 0 and result.stdout.strip():
+                return expected in result.stdout.split()
+    return True
+
 def ensure_directory(path: str) -> None:
     """Ensure that the directory exists, create it if it doesn't.
     
@@ -17,13 +110,32 @@ def ensure_directory(path: str) -> None:
         StorageError: If directory creation fails
     """
     try:
-        Path(path).mkdir(parents=True, exist_ok=True)
+        os.makedirs(path, exist_ok=True)
     except Exception as e:
         raise StorageError(f"Failed to create directory {path}: {str(e)}")
 
+def fsync_directory(path: str) -> None:
+    """Flush changes to a directory's entries (e.g. a rename into it) to disk.
+    
+    Does nothing on Windows, where directories can't be opened for fsync.
+    
+    Args:
+        path: Directory to flush
+    """
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
 def is_valid_path(path: str) -> bool:
     """Check if a path is valid and writable.
     
+    Only checks that the parent directory is writable; the filesystem is
+    not touched.
+    
     Args:
         path: Path to check
         
@@ -31,12 +143,29 @@ def is_valid_path(path: str) -> bool:
         bool: True if path is valid and writable, False otherwise
     """
     try:
-        Path(path).touch()
-        os.remove(path)
-        return True
-    except (OSError, IOError):
+        parent = os.path.dirname(os.path.abspath(path)) or '.'
+        return os.access(parent, os.W_OK | os.X_OK)
+    except (OSError, ValueError):
         return False
 
+def can_create_file(path: str) -> bool:
+    """Check that a new file can be created at path by creating and removing it.
+    
+    Args:
+        path: Path of a file that does not exist yet
+        
+    Returns:
+        bool: True if the file could be created, False otherwise
+            (including when it already exists)
+    """
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    except (OSError, ValueError):
+        return False
+    os.close(fd)
+    os.remove(path)
+    return True
+
 def serialize_data(data: Any) -> str:
     """Serialize data to JSON string.
     
@@ -67,13 +196,16 @@ def deserialize_data(data_str: str) -> Any:
         StorageError: If deserialization fails
     """
     try:
-        return json.loads(data_str)
+        return json_loads(data_str)
     except json.JSONDecodeError as e:
         raise StorageError(f"Failed to deserialize data: {str(e)}")
 
+@lru_cache(maxsize=8)
 def get_app_data_dir(app_name: str = "VaultGPT") -> str:
     """Get the application data directory for the current platform.
     
+    The result is cached per app_name for the life of the process.
+    
     Args:
         app_name: Name of the application
         
@@ -86,13 +218,22 @@ def get_app_data_dir(app_name: str = "VaultGPT") -> str:
     else:  # macOS and Linux
         return os.path.join(os.path.expanduser('~'), f".{app_name.lower()}")
 
+@lru_cache(maxsize=1)
+def _secure_temp_path() -> str:
+    """Path of the secure temporary directory (computed once per process)."""
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), 'vaultgpt_secure_temp')
+
 def get_secure_temp_dir() -> str:
     """Get a secure temporary directory for sensitive operations.
     
+    The directory is recreated if it has been removed since the last call,
+    e.g. by a tmp cleaner.
+    
     Returns:
         str: Path to a secure temporary directory
     """
-    import tempfile
-    temp_dir = os.path.join(tempfile.gettempdir(), 'vaultgpt_secure_temp')
-    os.makedirs(temp_dir, mode=0o700, exist_ok=True)
+    temp_dir = _secure_temp_path()
+    if not os.path.isdir(temp_dir):
+        os.makedirs(temp_dir, mode=0o700, exist_ok=True)
     return temp_dir